@@ -1,15 +1,24 @@
+import copy
 import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, List, Tuple, Any
 
-from utils import clamp
+from utils import clamp, fast_digest
 from rulesets import RULESETS
 
+try:
+    import re2  # google-re2: linear-time matching, no backtracking on large OCR text
+except Exception:
+    re2 = None
+
 # -----------------------------
 # Option 2: Upgraded analysis
 # -----------------------------
 
-@dataclass
+@dataclass(slots=True)
 class Hit:
     kind: str              # "pattern" | "keyword" | "context" | "absence"
     name: str              # rule/pattern name
@@ -26,15 +35,75 @@ def _snip(text: str, start: int, end: int, pad: int = 60) -> str:
     return snippet[:240] + ("…" if len(snippet) > 240 else "")
 
 
-def _regex_hits(text: str, name: str, pattern: str, flags=re.IGNORECASE) -> Tuple[int, List[str]]:
-    hits = []
-    for m in re.finditer(pattern, text, flags):
-        hits.append(_snip(text, m.start(), m.end()))
-    return len(hits), hits[:8]  # cap stored excerpts
+@lru_cache(maxsize=None)
+def _compile(pattern: str):
+    """Case-insensitive compiled pattern, on RE2 when installed and the syntax allows.
+
+    RE2's ``\\b``, ``\\w`` and ``\\d`` are ASCII-only; the ``re`` fallback is compiled
+    with ``re.ASCII`` so both engines flag the same spans (e.g. no Arabic-Indic digits
+    in an SSN pattern).
+    """
+    if re2 is not None:
+        try:
+            return re2.compile(f"(?i){pattern}")
+        except Exception:
+            pass
+    return re.compile(pattern, re.IGNORECASE | re.ASCII)
+
+
+def _compile_patterns(rs: Dict[str, Any]):
+    """One named-group alternation over all of a ruleset's patterns, so the text
+    is scanned once and each match is attributed via ``lastgroup``.
+
+    Assumes a ruleset's patterns don't match overlapping spans (true for the
+    shipped rulesets); where they would, the earlier pattern wins.
+    """
+    meta: List[Tuple[str, str, str | None, float]] = []
+    alternatives = []
+    for i, (pname, pdef) in enumerate(rs["patterns"].items()):
+        group = f"p{i}"
+        meta.append((group, pname, pdef.get("category"), float(pdef.get("confidence", 0.78))))
+        alternatives.append(f"(?P<{group}>{pdef['regex']})")
+    rx = _compile("|".join(alternatives)) if alternatives else None
+    return rx, meta
+
+
+# ruleset name -> (combined regex, [(group, pattern name, category, confidence)]), built once at import
+_COMPILED_PATTERNS = {name: _compile_patterns(rs) for name, rs in RULESETS.items()}
+
+
+MAX_EXCERPTS_PER_PATTERN = 8
+
 
+def _regex_hits(text: str, rx) -> Dict[str, Tuple[int, List[str]]]:
+    """group -> (match count, excerpts); excerpts are only built for the ones we keep."""
+    if rx is None:
+        return {}
+    counts: Dict[str, int] = {}
+    excerpts: Dict[str, List[str]] = {}
+    for m in rx.finditer(text):
+        group = m.lastgroup
+        n = counts.get(group, 0)
+        if n < MAX_EXCERPTS_PER_PATTERN:
+            excerpts.setdefault(group, []).append(_snip(text, m.start(), m.end()))
+        counts[group] = n + 1
+    return {g: (n, excerpts[g]) for g, n in counts.items()}
 
-def _contains_any(tlow: str, phrases: List[str]) -> List[str]:
-    return [p for p in phrases if p in tlow]
+
+def _find_any(tlow: str, phrases: List[str]) -> List[Tuple[str, int]]:
+    """(phrase, first index) for each phrase present; a single find() per phrase."""
+    found = []
+    for p in phrases:
+        idx = tlow.find(p)
+        if idx != -1:
+            found.append((p, idx))
+    return found
+
+
+# (content digest, ruleset) -> analysis; repeat runs on the same text skip the scan
+ANALYSIS_CACHE_MAX_ENTRIES = 64
+_analysis_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
 
 
 def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
@@ -42,7 +111,26 @@ def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
 
     IMPORTANT: This intentionally avoids storing the full document text in DB.
     Only short excerpts/snippets are stored.
+
+    Results are memoized in-process by content hash; callers get their own copy.
     """
+    key = (fast_digest((text or "").encode("utf-8", "surrogatepass")), ruleset_name)
+    with _analysis_cache_lock:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            _analysis_cache.move_to_end(key)
+            return copy.deepcopy(cached)
+
+    analysis = _analyze_text(text, ruleset_name)
+
+    with _analysis_cache_lock:
+        _analysis_cache[key] = analysis
+        while len(_analysis_cache) > ANALYSIS_CACHE_MAX_ENTRIES:
+            _analysis_cache.popitem(last=False)
+    return copy.deepcopy(analysis)
+
+
+def _analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
     rs = RULESETS[ruleset_name]
     t = text or ""
     tlow = t.lower()
@@ -51,20 +139,20 @@ def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
 
     # 1) Explicit CUI / markings signals
     explicit_marking_phrases = rs.get("explicit_markings", [])
-    explicit_found = _contains_any(tlow, explicit_marking_phrases)
+    explicit_pos = _find_any(tlow, explicit_marking_phrases)
+    explicit_found = [p for p, _ in explicit_pos]
     if explicit_found:
-        for p in explicit_found[:8]:
-            idx = tlow.find(p)
+        for p, idx in explicit_pos[:8]:
             hits.append(Hit(kind="keyword", name="explicit_marking",
                             excerpt=_snip(t, idx, idx + len(p)),
                             confidence=0.92, category="Explicitly Marked CUI"))
 
     # 2) Context / handling language signals (even if markings missing)
     context_phrases = rs.get("context_phrases", [])
-    ctx_found = _contains_any(tlow, context_phrases)
+    ctx_pos = _find_any(tlow, context_phrases)
+    ctx_found = [p for p, _ in ctx_pos]
     if ctx_found:
-        for p in ctx_found[:10]:
-            idx = tlow.find(p)
+        for p, idx in ctx_pos[:10]:
             hits.append(Hit(kind="context", name="handling_context",
                             excerpt=_snip(t, idx, idx + len(p)),
                             confidence=0.80, category="Handling / Dissemination"))
@@ -74,12 +162,12 @@ def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
     detected_patterns: List[Dict[str, Any]] = []
     cui_categories: Dict[str, float] = {}  # category -> confidence
 
-    for pname, pdef in rs["patterns"].items():
-        cnt, snippets = _regex_hits(t, pname, pdef["regex"])
+    combined_rx, pattern_meta = _COMPILED_PATTERNS[ruleset_name]
+    group_hits = _regex_hits(t, combined_rx)
+    for group, pname, cat, conf in pattern_meta:
+        cnt, snippets = group_hits.get(group, (0, []))
         if cnt:
             patterns_found[pname] = cnt
-            cat = pdef.get("category")
-            conf = float(pdef.get("confidence", 0.78))
             if cat:
                 cui_categories[cat] = max(cui_categories.get(cat, 0.0), conf)
             for sn in snippets:
@@ -101,20 +189,19 @@ def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
 
     # 5) Keyword triggers (legacy)
     kw_hits = []
-    for kw in rs.get("keywords", []):
-        if kw in tlow:
-            kw_hits.append(kw)
-            idx = tlow.find(kw)
-            hits.append(Hit(kind="keyword", name="keyword_trigger",
-                            excerpt=_snip(t, idx, idx + len(kw)),
-                            confidence=0.72, category="Keyword Trigger"))
+    for kw, idx in _find_any(tlow, rs.get("keywords", [])):
+        kw_hits.append(kw)
+        hits.append(Hit(kind="keyword", name="keyword_trigger",
+                        excerpt=_snip(t, idx, idx + len(kw)),
+                        confidence=0.72, category="Keyword Trigger"))
 
     # --- Scoring model ---
+    patterns_total = sum(patterns_found.values())
     weights = rs["weights"]
     score = 0.0
     score += len(explicit_found) * weights["explicit_marking"]
     score += min(len(ctx_found), 12) * weights["context"]
-    score += sum(patterns_found.values()) * weights["pattern"]
+    score += patterns_total * weights["pattern"]
     if missing_markings:
         score += weights["missing_markings_bonus"]
     score += len(kw_hits) * weights["keyword"]
@@ -167,6 +254,7 @@ def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
 
         "signals": signals,
         "patterns_found": patterns_found,
+        "patterns_total": patterns_total,
         "detected_patterns": detected_patterns,
         "cui_categories": categories_sorted,
 
@@ -180,6 +268,27 @@ def analyze_text(text: str, ruleset_name: str) -> Dict[str, Any]:
     }
 
 
+# Static control mapping, built once at import instead of on every analysis.
+_CMMC_L2_CONTROLS: Tuple[Dict[str, str], ...] = (
+    {"control": "AC.1.001", "title": "Limit system access to authorized users"},
+    {"control": "AC.3.018", "title": "Encrypt CUI at rest"},
+    {"control": "SC.3.177", "title": "Encrypt CUI in transit"},
+    {"control": "AU.2.041", "title": "Audit and accountability (logging)"},
+)
+
+_NIST_171_CONTROLS: Tuple[Dict[str, str], ...] = (
+    {"control": "3.1.1", "title": "Limit system access to authorized users"},
+    {"control": "3.13.8", "title": "Implement cryptographic protections for CUI"},
+    {"control": "3.3.1", "title": "Create and retain system audit logs"},
+)
+
+_FEDRAMP_MODERATE_CONTROLS: Tuple[Dict[str, str], ...] = (
+    {"control": "AC-2", "title": "Account management (authorized users)"},
+    {"control": "SC-13", "title": "Cryptographic protection"},
+    {"control": "AU-2", "title": "Event logging"},
+)
+
+
 def _build_recommendations_and_mapping(*, cui_detected: bool, risk_level: str, risk_score: int,
                                       categories: List[str], missing_markings: bool):
     recs: List[str] = []
@@ -201,24 +310,10 @@ def _build_recommendations_and_mapping(*, cui_detected: bool, risk_level: str, r
         if risk_level == "HIGH":
             recs.insert(0, "Treat as high-risk CUI exposure: quarantine distribution and initiate incident review.")
 
-        cmmc.extend([
-            {"control": "AC.1.001", "title": "Limit system access to authorized users"},
-            {"control": "AC.3.018", "title": "Encrypt CUI at rest"},
-            {"control": "SC.3.177", "title": "Encrypt CUI in transit"},
-            {"control": "AU.2.041", "title": "Audit and accountability (logging)"},
-        ])
-
-        nist171.extend([
-            {"control": "3.1.1", "title": "Limit system access to authorized users"},
-            {"control": "3.13.8", "title": "Implement cryptographic protections for CUI"},
-            {"control": "3.3.1", "title": "Create and retain system audit logs"},
-        ])
-
-        fedramp.extend([
-            {"control": "AC-2", "title": "Account management (authorized users)"},
-            {"control": "SC-13", "title": "Cryptographic protection"},
-            {"control": "AU-2", "title": "Event logging"},
-        ])
+        # Copy rows so callers can't mutate the shared module-level tables
+        cmmc.extend(dict(c) for c in _CMMC_L2_CONTROLS)
+        nist171.extend(dict(c) for c in _NIST_171_CONTROLS)
+        fedramp.extend(dict(c) for c in _FEDRAMP_MODERATE_CONTROLS)
     else:
         recs.append("No strong CUI indicators detected. Apply standard information handling and validate classification.")
         if risk_score > 0:
@@ -4,13 +4,34 @@ import streamlit as st
 from utils import now_iso
 
 
-def build_artifacts(meta, analysis):
+def _df_to_csv_bytes(df):
+    # One pinned encoder: analysis_summary.csv is a hashed evidence artifact, so its
+    # bytes must not depend on optional installs (pyarrow formats bools, numbers and
+    # quoting differently) or on the OS line separator.
+    return df.to_csv(index=False, lineterminator="\n").encode("utf-8")
+
+
+# analysis_summary.csv columns: the document row, then the pattern-hit rows
+_SUMMARY_COLUMNS = (
+    "filename", "sha256", "uploaded_at", "ruleset", "risk_level", "risk_score",
+    "cui_detected", "missing_markings_heuristic", "cui_categories",
+)
+_PATTERN_COLUMNS = ("type", "pattern", "category", "confidence", "excerpt")
+
+
+def _json_bytes(obj):
+    # The JSON reports are hashed evidence artifacts too: always the stdlib encoder
+    # (orjson writes non-ASCII as raw UTF-8 where json escapes it, so hashes would vary).
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def build_artifacts(meta, analysis, generated_at=None):
     payload = {
         "meta": meta,
         "analysis": analysis,
-        "generated_at": now_iso(),
+        "generated_at": generated_at or now_iso(),
     }
-    analysis_json = json.dumps(payload, indent=2).encode("utf-8")
+    analysis_json = _json_bytes(payload)
 
     findings = {
         "inspection": {
@@ -28,9 +49,9 @@ def build_artifacts(meta, analysis):
         "recommendations": analysis.get("recommendations", []),
         "compliance_mapping": analysis.get("compliance_mapping", {}),
     }
-    findings_json = json.dumps(findings, indent=2).encode("utf-8")
+    findings_json = _json_bytes(findings)
 
-    mapping_json = json.dumps(analysis.get("compliance_mapping", {}), indent=2).encode("utf-8")
+    mapping_json = _json_bytes(analysis.get("compliance_mapping", {}))
 
     rows = [{
         "filename": meta.get("filename"),
@@ -53,8 +74,10 @@ def build_artifacts(meta, analysis):
             "excerpt": dp.get("excerpt"),
         })
 
-    df = pd.DataFrame(rows)
-    summary_csv = df.to_csv(index=False).encode("utf-8")
+    # Explicit columns spare pandas from unioning the keys of every row dict
+    columns = _SUMMARY_COLUMNS + (_PATTERN_COLUMNS if len(rows) > 1 else ())
+    df = pd.DataFrame.from_records(rows, columns=list(columns))
+    summary_csv = _df_to_csv_bytes(df)
 
     rec_lines = ["CUI Inspector Recommendations", "==========================", ""]
     for i, r in enumerate(analysis.get("recommendations", []), 1):
@@ -1,8 +1,8 @@
-from db import get_db
+from db import get_connection
 from utils import now_iso
 
 def log_event(user, action, target=""):
-    con = get_db()
+    con = get_connection()
     con.execute(
         """
         INSERT INTO audit_log
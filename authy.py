@@ -1,5 +1,5 @@
 import streamlit as st
-from db import get_db
+from db import get_connection
 from utils import now_iso, verify_password
 
 def render_login():
@@ -16,7 +16,7 @@ def render_login():
             st.error("Invalid credentials")
 
 def login(email, password):
-    con = get_db()
+    con = get_connection()
     row = con.execute(
         "SELECT * FROM users WHERE email=? AND is_active=1",
         (email,)
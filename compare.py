@@ -1,17 +1,33 @@
 import json
 import streamlit as st
-from db import get_connection
+from db import get_connection, get_shared_connection
+
+
+# Saved inspections never change, so a load is cached by (tenant, id) across reruns
+@st.cache_data(show_spinner=False, max_entries=64)
+def _load_inspection(tenant_id, inspection_id):
+    # Shared across sessions, so it must not use a session's own connection
+    con = get_shared_connection()
+    row = con.execute(
+        "SELECT * FROM inspections WHERE id=? AND tenant_id=?", (inspection_id, tenant_id)
+    ).fetchone()
+    analysis = json.loads(row["analysis_json"])
+    arts = con.execute("SELECT name, sha256 FROM artifacts WHERE inspection_id=?", (inspection_id,)).fetchall()
+    return dict(row), analysis, [dict(a) for a in arts]
+
 
 def render_compare_page():
     st.header("🆚 Compare Inspections")
 
     con = get_connection()
+    tenant_id = st.session_state.active_tenant
     rows = con.execute("""
         SELECT id, filename, risk_level, risk_score, created_at
         FROM inspections
+        WHERE tenant_id=?
         ORDER BY created_at DESC
         LIMIT 200
-    """).fetchall()
+    """, (tenant_id,)).fetchall()
 
     if len(rows) < 2:
         st.info("At least two inspections required.")
@@ -29,14 +45,8 @@ def render_compare_page():
         st.warning("Select two different inspections.")
         return
 
-    def load(i):
-        row = con.execute("SELECT * FROM inspections WHERE id=?", (i,)).fetchone()
-        analysis = json.loads(row["analysis_json"])
-        arts = con.execute("SELECT name, sha256 FROM artifacts WHERE inspection_id=?", (i,)).fetchall()
-        return row, analysis, arts
-
-    Lr, La, Larts = load(labels[left])
-    Rr, Ra, Rarts = load(labels[right])
+    Lr, La, Larts = _load_inspection(tenant_id, labels[left])
+    Rr, Ra, Rarts = _load_inspection(tenant_id, labels[right])
 
     st.subheader("Risk Delta")
     st.metric("Score", f"{Lr['risk_score']} → {Rr['risk_score']}")
@@ -61,5 +71,3 @@ def render_compare_page():
             f"{name}: "
             f"{'MATCH' if lmap.get(name)==rmap.get(name) else 'DIFFERENT'}"
         )
-
-    con.close()
@@ -1,5 +1,9 @@
 # Optional OCR configuration (safe defaults)
 TESSERACT_CMD = ""      # blank = default
 POPPLER_PATH = None     # blank = default
-OCR_DPI = 300
+OCR_DPI = 200
 OCR_LANGUAGE = "eng"
+OCR_WORKERS = None      # pages OCR'd concurrently; None = one per CPU core
+OCR_MIN_PAGE_CHARS = 30 # pages with less embedded text than this are OCR'd
+OCR_BINARIZE = True     # 1-bit pages before tesseract
+OCR_ENGINE = "tesseract"  # or "easyocr" (GPU when CUDA is available; needs easyocr installed)
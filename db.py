@@ -1,16 +1,49 @@
 import sqlite3
+from functools import lru_cache
 from pathlib import Path
 
+import streamlit as st
+
 DB_PATH = Path("cui_inspector.db")
 
 def get_db():
     con = sqlite3.connect(DB_PATH, check_same_thread=False)
     con.row_factory = sqlite3.Row
+    # Per-connection settings; journal_mode=WAL is persisted by init_db.
+    # NORMAL is durable under WAL except for the last commits on power loss.
+    # Every session holds its own connection, so the page cache stays small (4 MiB);
+    # reads mostly come through the mmap, which is shared OS page cache.
+    con.executescript("""
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-4096;
+    """)
     return con
 
+def get_connection():
+    # One connection per Streamlit session, reused across reruns so SQLite's
+    # page cache stays warm. Callers must not close it.
+    con = st.session_state.get("_db_con")
+    if con is None:
+        con = get_db()
+        st.session_state["_db_con"] = con
+    return con
+
+@st.cache_resource
+def get_shared_connection():
+    # Process-wide, read-only use from st.cache_data functions: their results are
+    # shared by all sessions, so they must not reach into one session's state.
+    return get_db()
+
+@lru_cache(maxsize=1)
 def init_db():
+    # Applied once per process; later calls are no-ops.
     con = get_db()
 
+    # WAL lets sessions read while another writes; the mode sticks to the file.
+    con.execute("PRAGMA journal_mode=WAL")
+
     con.executescript("""
     CREATE TABLE IF NOT EXISTS tenants (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,6 +72,49 @@ def init_db():
         target TEXT,
         timestamp TEXT
     );
+
+    CREATE TABLE IF NOT EXISTS inspections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tenant_id INTEGER,
+        filename TEXT,
+        sha256 TEXT,
+        ruleset TEXT,
+        risk_level TEXT,
+        risk_score INTEGER,
+        analysis_json BLOB,
+        created_at TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS artifacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        inspection_id INTEGER NOT NULL,
+        name TEXT,
+        sha256 TEXT,
+        content BLOB,
+        created_at TEXT
+    );
+    """)
+
+    # Databases created before inspections were tenant-scoped
+    cols = {r["name"] for r in con.execute("PRAGMA table_info(inspections)")}
+    if "tenant_id" not in cols:
+        con.execute("ALTER TABLE inspections ADD COLUMN tenant_id INTEGER")
+
+        # One-time migration of the legacy rows: with a single active tenant the owner
+        # is unambiguous, so adopt them. Otherwise they stay NULL, and NULL never matches
+        # the tenant_id=? filter every page applies, so they stay hidden until assigned.
+        tenant_ids = [r["id"] for r in con.execute("SELECT id FROM tenants WHERE is_active=1")]
+        if len(tenant_ids) == 1:
+            con.execute("UPDATE inspections SET tenant_id=? WHERE tenant_id IS NULL", (tenant_ids[0],))
+
+    # Tenant listing reads newest-first straight off the index (no sort);
+    # artifact lookups by inspection avoid a full scan of the blob table.
+    con.executescript("""
+    CREATE INDEX IF NOT EXISTS idx_inspections_tenant_created
+        ON inspections(tenant_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_artifacts_inspection
+        ON artifacts(inspection_id);
     """)
 
     con.commit()
+    con.close()
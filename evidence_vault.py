@@ -1,76 +1,161 @@
 import json
+import math
 import hashlib
 import streamlit as st
 
-from db import get_connection
+from db import get_connection, get_shared_connection
 from utils import now_iso
 
+try:
+    import orjson  # C encoder; emits UTF-8 bytes directly
+except Exception:
+    orjson = None
 
-def save_inspection(meta, analysis, artifacts):
+VAULT_PAGE_SIZE = 25
+
+
+def _analysis_to_json(analysis):
+    # json.loads reads either form back, so rows written before/without orjson still load
+    if orjson is not None:
+        try:
+            return orjson.dumps(analysis)
+        except Exception:
+            pass
+    return json.dumps(analysis)
+
+
+def save_inspection(meta, analysis, artifacts, tenant_id, created_at=None):
+    # Every page filters on tenant_id; an ownerless CUI record would be unreachable
+    if tenant_id is None:
+        raise ValueError("save_inspection requires a tenant_id")
     con = get_connection()
-    cur = con.cursor()
-
-    cur.execute("""
-        INSERT INTO inspections
-        (filename, sha256, ruleset, risk_level, risk_score, analysis_json, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        meta["filename"],
-        meta["sha256"],
-        analysis["ruleset"],
-        analysis["risk_level"],
-        analysis["risk_score"],
-        json.dumps(analysis),
-        now_iso()
-    ))
-
-    inspection_id = cur.lastrowid
-
-    for name, content in artifacts.items():
-        h = hashlib.sha256(content).hexdigest()
-        cur.execute("""
+    ts = created_at or now_iso()
+
+    # One transaction for the inspection and all of its artifacts
+    with con:
+        cur = con.execute("""
+            INSERT INTO inspections
+            (tenant_id, filename, sha256, ruleset, risk_level, risk_score, analysis_json, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            tenant_id,
+            meta["filename"],
+            meta["sha256"],
+            analysis["ruleset"],
+            analysis["risk_level"],
+            analysis["risk_score"],
+            _analysis_to_json(analysis),
+            ts
+        ))
+
+        inspection_id = cur.lastrowid
+
+        con.executemany("""
             INSERT INTO artifacts
             (inspection_id, name, sha256, content, created_at)
             VALUES (?, ?, ?, ?, ?)
-        """, (inspection_id, name, h, content, now_iso()))
+        """, [
+            (inspection_id, name, hashlib.sha256(content).hexdigest(), content, ts)
+            for name, content in artifacts.items()
+        ])
 
-    con.commit()
-    con.close()
+    # New inspection: drop the cached vault listing so it shows up immediately
+    _vault_total.clear()
+    _vault_page.clear()
 
 
-def render_evidence_vault():
-    st.header("📦 Evidence Vault")
+@st.cache_data(ttl=5, show_spinner=False)
+def _vault_total(tenant_id):
+    return get_shared_connection().execute(
+        "SELECT COUNT(*) FROM inspections WHERE tenant_id=?", (tenant_id,)
+    ).fetchone()[0]
 
-    con = get_connection()
-    rows = con.execute("""
-        SELECT id, filename, risk_level, risk_score, created_at
+
+@st.cache_data(ttl=5, show_spinner=False, max_entries=8)
+def _vault_page(tenant_id, page):
+    """One page of inspection metadata with parsed analyses.
+
+    Cached briefly so widget clicks (download, page input) don't re-query and
+    re-parse the page on every rerun. Artifact contents and their integrity
+    check are deliberately not cached: see _page_artifacts.
+    """
+    rows = get_shared_connection().execute("""
+        SELECT id, filename, risk_level, risk_score, analysis_json, created_at
         FROM inspections
+        WHERE tenant_id=?
         ORDER BY created_at DESC
-    """).fetchall()
+        LIMIT ? OFFSET ?
+    """, (tenant_id, VAULT_PAGE_SIZE, (int(page) - 1) * VAULT_PAGE_SIZE)).fetchall()
+
+    return [
+        {
+            "id": r["id"],
+            "filename": r["filename"],
+            "risk_level": r["risk_level"],
+            "risk_score": r["risk_score"],
+            "created_at": r["created_at"],
+            "analysis": json.loads(r["analysis_json"]),
+        }
+        for r in rows
+    ]
+
+
+def _page_artifacts(inspection_ids):
+    """Artifacts for the page's inspections, hash-checked against the stored SHA-256.
+
+    Read fresh on every render (one query for the page) so the "Hash verified"
+    badge always reflects the row being shown.
+    """
+    if not inspection_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(inspection_ids))
+    arts_by_insp = {}
+    for a in get_connection().execute(f"""
+        SELECT inspection_id, name, sha256, content
+        FROM artifacts
+        WHERE inspection_id IN ({placeholders})
+    """, inspection_ids):
+        arts_by_insp.setdefault(a["inspection_id"], []).append({
+            "name": a["name"],
+            "content": a["content"],
+            "verified": hashlib.sha256(a["content"] or b"").hexdigest() == a["sha256"],
+        })
+    return arts_by_insp
+
 
-    if not rows:
+def render_evidence_vault():
+    st.header("📦 Evidence Vault")
+
+    tenant_id = st.session_state.active_tenant
+    total = _vault_total(tenant_id)
+
+    if not total:
         st.info("No inspections stored yet.")
         return
 
+    _vault_listing(tenant_id, total)
+
+
+# A fragment: paging and download clicks rerun only the listing, not the whole app
+@st.fragment
+def _vault_listing(tenant_id, total):
+    # Only the visible page is queried and rendered on each rerun.
+    pages = max(1, math.ceil(total / VAULT_PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="vault_page")
+    st.caption(f"{total} inspection(s) • page {page} of {pages}")
+
+    rows = _vault_page(tenant_id, int(page))
+    arts_by_insp = _page_artifacts([r["id"] for r in rows])
+
     for r in rows:
         with st.expander(
             f"#{r['id']} • {r['filename']} • {r['risk_level']} ({r['risk_score']})"
         ):
             st.caption(f"Created at: {r['created_at']}")
 
-            analysis = json.loads(
-                con.execute(
-                    "SELECT analysis_json FROM inspections WHERE id=?",
-                    (r["id"],)
-                ).fetchone()[0]
-            )
-            st.json(analysis)
+            st.json(r["analysis"])
 
-            arts = con.execute("""
-                SELECT name, sha256, content
-                FROM artifacts
-                WHERE inspection_id=?
-            """, (r["id"],)).fetchall()
+            arts = arts_by_insp.get(r["id"], [])
 
             st.subheader("Artifacts")
 
@@ -85,12 +170,9 @@ def render_evidence_vault():
                     key=download_key
                 )
 
-                recomputed = hashlib.sha256(a["content"]).hexdigest()
-                if recomputed == a["sha256"]:
+                if a["verified"]:
                     st.success("Hash verified")
                 else:
                     st.error("Hash mismatch")
 
-    con.close()
-
 
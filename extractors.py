@@ -1,51 +1,388 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 
-OCR_AVAILABLE = True
+from utils import sha256_bytes
 
 try:
     import pytesseract
 except Exception:
     pytesseract = None
-    OCR_AVAILABLE = False
 
 try:
     import pdf2image
 except Exception:
     pdf2image = None
-    OCR_AVAILABLE = False
 
 try:
-    from config import TESSERACT_CMD, POPPLER_PATH, OCR_DPI, OCR_LANGUAGE
+    from PIL import Image
+except Exception:
+    Image = None
+
+try:
+    import pypdfium2 as pdfium
+except Exception:
+    pdfium = None
+
+# PDFium is not thread-safe, even across separate documents, and every Streamlit
+# session runs on its own thread: all PDFium work (open, use, close) holds this lock.
+_pdfium_lock = threading.Lock()
+
+try:
+    from config import (
+        TESSERACT_CMD, POPPLER_PATH, OCR_DPI, OCR_LANGUAGE, OCR_WORKERS,
+        OCR_MIN_PAGE_CHARS, OCR_BINARIZE, OCR_ENGINE,
+    )
 except Exception:
     TESSERACT_CMD = ""
     POPPLER_PATH = None
-    OCR_DPI = 300
+    OCR_DPI = 200
     OCR_LANGUAGE = "eng"
+    OCR_WORKERS = None
+    OCR_MIN_PAGE_CHARS = 30
+    OCR_BINARIZE = True
+    OCR_ENGINE = "tesseract"
 
 if pytesseract and TESSERACT_CMD:
     pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 
+# easyocr pulls in torch at import; only load it when it is the configured engine
+easyocr = None
+if OCR_ENGINE == "easyocr":
+    try:
+        import easyocr
+    except Exception:
+        easyocr = None
+
+# EasyOCR (GPU) only when selected and installed; tesseract remains the CPU path
+USE_EASYOCR = OCR_ENGINE == "easyocr" and easyocr is not None
+
+if not USE_EASYOCR:
+    # Each tesseract OCRs one page on one core; its own OpenMP threads would oversubscribe
+    # the page workers. libgomp reads this when tesserocr loads it, and pytesseract's
+    # subprocess inherits os.environ (it takes no per-call env), so it has to be process-wide.
+    # This module is imported lazily from a session thread, so a concurrently running
+    # session may see it appear; an explicit value in the environment wins. EasyOCR feeds
+    # pages one at a time and keeps torch's OpenMP threads.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+try:
+    import tesserocr  # in-process tesseract: the model loads once per pooled API, not per page
+except Exception:
+    tesserocr = None
+
+# OCR needs something to rasterize pages (PDFium + PIL, or poppler) and an engine to read them
+OCR_AVAILABLE = ((pdfium is not None and Image is not None) or pdf2image is not None) and (
+    USE_EASYOCR or tesserocr is not None or pytesseract is not None
+)
+
+_EASYOCR_LANGS = {"eng": "en", "deu": "de", "fra": "fr", "spa": "es"}
+_easyocr_reader = None
+_easyocr_lock = threading.Lock()
+
+
+# CPU budget shared by every session: one slot per page being OCR'd or per pdftoppm
+# process rendering, so concurrent extractions can't oversubscribe the cores.
+_ocr_slots = threading.BoundedSemaphore(OCR_WORKERS or os.cpu_count() or 1)
+
+
+def _take_slots(wanted):
+    """Block for one slot, then take up to ``wanted - 1`` more that are free right now."""
+    _ocr_slots.acquire()
+    taken = 1
+    while taken < wanted and _ocr_slots.acquire(blocking=False):
+        taken += 1
+    return taken
+
+
+def _get_easyocr_reader():
+    global _easyocr_reader
+    with _easyocr_lock:
+        if _easyocr_reader is None:
+            # Loads the detection/recognition models once; easyocr uses CPU if CUDA is absent
+            lang = _EASYOCR_LANGS.get(OCR_LANGUAGE, OCR_LANGUAGE)
+            _easyocr_reader = easyocr.Reader([lang], gpu=True)
+        return _easyocr_reader
+
+
+# OCR text keyed by PDF SHA-256. Kept in process memory only: full document
+# text is deliberately never written to the database.
+OCR_CACHE_MAX_ENTRIES = 32
+_ocr_cache = OrderedDict()
+_ocr_cache_lock = threading.Lock()
+
+
+def _ocr_cache_get(digest):
+    with _ocr_cache_lock:
+        text = _ocr_cache.get(digest)
+        if text is not None:
+            _ocr_cache.move_to_end(digest)
+        return text
+
+
+def _ocr_cache_put(digest, text):
+    with _ocr_cache_lock:
+        _ocr_cache[digest] = text
+        _ocr_cache.move_to_end(digest)
+        while len(_ocr_cache) > OCR_CACHE_MAX_ENTRIES:
+            _ocr_cache.popitem(last=False)
+
+
+def _otsu_threshold(hist):
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best, threshold = -1.0, 127
+    for i, h in enumerate(hist):
+        weight_bg += h
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def _binarize_page(path):
+    # Rewrite the page as 1-bit (Otsu) G4 TIFF: far fewer bytes through tesseract
+    with Image.open(path) as img:
+        gray = img.convert("L")
+    threshold = _otsu_threshold(gray.histogram())
+    lut = [255 if i > threshold else 0 for i in range(256)]
+    gray.point(lut, "1").save(path, compression="group4")
+
+
+# Idle PyTessBaseAPIs, shared by every extraction. The worker threads only live as long
+# as one PDF, so APIs are checked out per page instead of tied to a thread; _ocr_slots
+# caps how many are ever created.
+_tess_apis = []
+_tess_apis_lock = threading.Lock()
+
+
+def _checkout_tess_api():
+    with _tess_apis_lock:
+        if _tess_apis:
+            return _tess_apis.pop()
+    return tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE, oem=tesserocr.OEM.LSTM_ONLY)
+
+
+def _return_tess_api(api):
+    api.Clear()
+    with _tess_apis_lock:
+        _tess_apis.append(api)
+
+
+def _ocr_page(page):
+    # page is a PIL image or an image file path
+    if USE_EASYOCR:
+        return "\n".join(_get_easyocr_reader().readtext(page, detail=0, paragraph=True))
+    with _ocr_slots:
+        if OCR_BINARIZE and Image is not None and isinstance(page, str):
+            _binarize_page(page)
+        if tesserocr is not None:
+            api = _checkout_tess_api()
+            try:
+                if isinstance(page, str):
+                    api.SetImageFile(page)
+                else:
+                    api.SetImage(page)
+                api.SetSourceResolution(OCR_DPI)
+                return api.GetUTF8Text().strip()
+            finally:
+                _return_tess_api(api)
+        text = pytesseract.image_to_string(page, lang=OCR_LANGUAGE, config=f"--oem 1 --dpi {OCR_DPI}")
+    # tesseract pads every page with blank lines and a trailing form feed
+    return text.strip()
+
+
+def _pdfium_page_texts(uploaded_file):
+    with _pdfium_lock:
+        uploaded_file.seek(0)
+        pdf = pdfium.PdfDocument(uploaded_file)
+        try:
+            out = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                # PDFium breaks lines with \r\n; match PyPDF2's \n so excerpts don't depend on the backend
+                out.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+            return out
+        finally:
+            pdf.close()
+
+
+def _pdf_page_texts(uploaded_file):
+    """Embedded text per page: PDFium (native) when installed, PyPDF2 otherwise."""
+    if pdfium is not None:
+        try:
+            return _pdfium_page_texts(uploaded_file)
+        except Exception:
+            pass
 
-def extract_text_from_pdf(uploaded_file):
     from PyPDF2 import PdfReader
+    uploaded_file.seek(0)
     reader = PdfReader(uploaded_file)
-    text = "\n".join(pg.extract_text() or "" for pg in reader.pages)
+    return [pg.extract_text() or "" for pg in reader.pages]
+
+
+def _pdfium_render_pages(uploaded_file, indices, out_dir):
+    # Render in-process from the upload itself: no temp PDF, no poppler re-parse.
+    # The lock is taken per PDFium call, not per document, so a long scan doesn't
+    # hold up other sessions; the TIFF encoding runs outside it.
+    with _pdfium_lock:
+        uploaded_file.seek(0)
+        pdf = pdfium.PdfDocument(uploaded_file)
+    try:
+        paths = []
+        for i in indices:
+            with _pdfium_lock:
+                page = pdf[i]
+                bitmap = page.render(scale=OCR_DPI / 72, grayscale=True)
+                # to_pil() shares the bitmap's buffer; copy it before the bitmap is released
+                img = bitmap.to_pil().copy()
+                bitmap.close()
+                page.close()
+            path = os.path.join(out_dir, f"page-{i + 1:05d}.tiff")
+            img.save(path, dpi=(OCR_DPI, OCR_DPI))
+            paths.append(path)
+        return paths
+    finally:
+        with _pdfium_lock:
+            pdf.close()
+
+
+def _poppler_render_pages(uploaded_file, indices, out_dir):
+    # Write the upload's buffer straight to disk (no getvalue() copy) and
+    # have poppler render pages to files there.
+    pdf_path = os.path.join(out_dir, "upload.pdf")
+    with open(pdf_path, "wb") as fh:
+        fh.write(uploaded_file.getbuffer())
 
-    if not text.strip() and OCR_AVAILABLE:
+    # One poppler call per run of consecutive scanned pages
+    paths = []
+    for first, last in _contiguous_runs(indices):
+        # Split long runs across parallel pdftoppm processes, as many as there are free slots
+        slots = _take_slots(last - first + 1)
         try:
-            images = pdf2image.convert_from_bytes(
-                uploaded_file.getvalue(),
+            paths.extend(pdf2image.convert_from_path(
+                pdf_path,
                 dpi=OCR_DPI,
-                poppler_path=POPPLER_PATH
-            )
-            text = "\n".join(
-                pytesseract.image_to_string(img, lang=OCR_LANGUAGE)
-                for img in images
-            )
+                poppler_path=POPPLER_PATH,
+                fmt="tiff",
+                grayscale=True,
+                first_page=first + 1,
+                last_page=last + 1,
+                output_folder=out_dir,
+                paths_only=True,
+                thread_count=slots,
+            ))
+        finally:
+            for _ in range(slots):
+                _ocr_slots.release()
+    return paths
+
+
+def _render_pages(uploaded_file, indices, out_dir):
+    """Rasterize the given 0-based pages to image files; tesseract reads them from disk."""
+    if pdfium is not None and Image is not None:
+        try:
+            return _pdfium_render_pages(uploaded_file, indices, out_dir)
+        except Exception:
+            if pdf2image is None:
+                raise
+    return _poppler_render_pages(uploaded_file, indices, out_dir)
+
+
+def _contiguous_runs(indices):
+    """[0, 1, 2, 5, 7, 8] -> [(0, 2), (5, 5), (7, 8)]"""
+    runs = []
+    for i in indices:
+        if runs and i == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], i)
+        else:
+            runs.append((i, i))
+    return runs
+
+
+def extract_text_from_pdf(uploaded_file):
+    page_texts = _pdf_page_texts(uploaded_file)
+
+    # Only pages without embedded text are image-only and worth OCR'ing
+    scanned = [i for i, t in enumerate(page_texts) if len(t.strip()) < OCR_MIN_PAGE_CHARS]
+
+    if scanned and OCR_AVAILABLE:
+        digest = sha256_bytes(uploaded_file.getbuffer())
+        cached = _ocr_cache_get(digest)
+        if cached is not None:
+            return cached
+
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                pages = _render_pages(uploaded_file, scanned, tmpdir)
+                # Tesseract runs as a subprocess (pytesseract) or without the GIL (tesserocr),
+                # so threads overlap pages.
+                # The single EasyOCR model instance is fed pages one at a time instead.
+                workers = 1 if USE_EASYOCR else max(1, min(OCR_WORKERS or os.cpu_count() or 1, len(pages)))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for i, page_text in zip(scanned, pool.map(_ocr_page, pages)):
+                        page_texts[i] = page_text
+
+            text = "\n".join(page_texts)
+            _ocr_cache_put(digest, text)
+            return text
         except Exception as e:
             st.error(f"OCR failed: {e}")
 
-    return text
+    return "\n".join(page_texts)
+
+
+def _xlsx_text_openpyxl(uploaded_file):
+    from openpyxl import load_workbook
+
+    # read_only streams each sheet's XML row by row instead of building the workbook graph
+    uploaded_file.seek(0)
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        out = []
+        for ws in wb.worksheets:
+            out.append(f"Sheet: {ws.title}")
+            for row in ws.iter_rows(values_only=True):
+                line = " ".join(str(v) for v in row if v is not None and v != "")
+                if line:
+                    out.append(line)
+        return "\n".join(out)
+    finally:
+        wb.close()
+
+
+def extract_text_from_xlsx(uploaded_file):
+    import pandas as pd
+
+    # calamine (Rust) parses straight into columns; without it, stream rows via openpyxl.
+    try:
+        sheets = pd.read_excel(uploaded_file, sheet_name=None, header=None, dtype=str, engine="calamine")
+    except ImportError:
+        return _xlsx_text_openpyxl(uploaded_file)
+
+    out = []
+    for sheet_name, df in sheets.items():
+        out.append(f"Sheet: {sheet_name}")
+        for row in df.fillna("").itertuples(index=False):
+            line = " ".join(v for v in row if v)
+            if line:
+                out.append(line)
+    return "\n".join(out)
 
 
 def extract_text_from_file(uploaded_file):
@@ -54,7 +391,7 @@ def extract_text_from_file(uploaded_file):
     if name.endswith(".pdf"):
         return extract_text_from_pdf(uploaded_file)
     if name.endswith(".txt"):
-        return uploaded_file.getvalue().decode("utf-8", errors="ignore")
+        return str(uploaded_file.getbuffer(), "utf-8", errors="ignore")
     if name.endswith(".docx"):
         from docx import Document
         doc = Document(uploaded_file)
@@ -65,8 +402,12 @@ def extract_text_from_file(uploaded_file):
         out = []
         for slide in prs.slides:
             for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    out.append(shape.text.strip())
+                # shape.text is rebuilt from its runs on every access; read it once
+                text = (getattr(shape, "text", "") or "").strip()
+                if text:
+                    out.append(text)
         return "\n".join(out)
+    if name.endswith(".xlsx"):
+        return extract_text_from_xlsx(uploaded_file)
     return ""
 
@@ -1,7 +1,12 @@
 import csv
+import hashlib
 import io
+import shutil
+import time
 import zipfile
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import Any, Iterable, Tuple
 
 import streamlit as st
 
@@ -26,11 +31,12 @@ def _fetch_inspections(con, where_sql: str, params: list):
 
 
 def _fetch_artifacts(con, inspection_ids: list[int]):
+    # Metadata only; contents are streamed by _iter_artifact_entries when bundling
     if not inspection_ids:
         return []
     placeholders = ",".join(["?"] * len(inspection_ids))
     return con.execute(f"""
-        SELECT id, inspection_id, name, sha256, content, created_at
+        SELECT id, inspection_id, name, sha256, length(content) AS size_bytes, created_at
         FROM artifacts
         WHERE inspection_id IN ({placeholders})
         ORDER BY inspection_id DESC, name ASC
@@ -62,79 +68,166 @@ def _build_manifest_csv(inspections, artifacts) -> bytes:
         "artifact_bytes",
     ])
 
-    for insp in inspections:
-        insp_id = insp["id"]
-        insp_arts = arts_by_insp.get(insp_id, [])
-
-        if not insp_arts:
-            # still emit a row for inspection (artifact fields empty)
-            writer.writerow([
-                insp_id,
+    def rows():
+        for insp in inspections:
+            # Inspection columns are built once and shared by all of its artifact rows
+            insp_cols = [
+                insp["id"],
                 insp["created_at"],
                 insp["filename"],
                 insp["sha256"],
                 insp["ruleset"],
                 insp["risk_level"],
                 insp["risk_score"],
-                "",
-                "",
-                "",
-                "",
-                "",
-            ])
-        else:
-            for a in insp_arts:
-                bsize = len(a["content"]) if a["content"] is not None else 0
-                writer.writerow([
-                    insp_id,
-                    insp["created_at"],
-                    insp["filename"],
-                    insp["sha256"],
-                    insp["ruleset"],
-                    insp["risk_level"],
-                    insp["risk_score"],
-                    a["id"],
-                    a["name"],
-                    a["sha256"],
-                    a["created_at"],
-                    bsize,
-                ])
+            ]
+            insp_arts = arts_by_insp.get(insp["id"])
+
+            if not insp_arts:
+                # still emit a row for inspection (artifact fields empty)
+                yield insp_cols + ["", "", "", "", ""]
+            else:
+                for a in insp_arts:
+                    yield insp_cols + [
+                        a["id"],
+                        a["name"],
+                        a["sha256"],
+                        a["created_at"],
+                        a["size_bytes"] or 0,
+                    ]
+
+    # One writerows call keeps the per-row loop inside the C csv writer
+    writer.writerows(rows())
 
     return out.getvalue().encode("utf-8")
 
 
-def _build_hashes_txt(inspections, artifacts) -> bytes:
+def _build_hashes_txt(inspections, artifacts, include_source=True) -> bytes:
     # Format compatible with common sha256sum style:
     # <sha256>  <path>
     lines = []
 
     # Add source file hashes (inspection file_sha256)
-    for insp in inspections:
-        path = f"source/{insp['filename']}"
-        lines.append(f"{insp['sha256']}  {path}")
+    if include_source:
+        lines.extend(f"{insp['sha256']}  source/{insp['filename']}" for insp in inspections)
 
     # Add artifact hashes
-    for a in artifacts:
-        path = f"inspection_{a['inspection_id']}/{a['name']}"
-        lines.append(f"{a['sha256']}  {path}")
+    lines.extend(f"{a['sha256']}  inspection_{a['inspection_id']}/{a['name']}" for a in artifacts)
 
     txt = "\n".join(lines) + "\n"
     return txt.encode("utf-8")
 
 
-def _build_bundle_zip(manifest_csv: bytes, hashes_txt: bytes, artifacts, include_artifacts: bool) -> bytes:
-    buf = io.BytesIO()
-    with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("manifest.csv", manifest_csv)
-        zf.writestr("hashes.sha256.txt", hashes_txt)
+# Bundles larger than this spill from RAM to a temp file while being written
+ZIP_SPOOL_MAX_BYTES = 32 << 20
+
+# Already-compressed formats gain nothing from deflate; store them as-is
+_PRECOMPRESSED_EXTS = (".pdf", ".docx", ".xlsx", ".pptx", ".zip", ".png", ".jpg", ".jpeg")
+
+
+def _zip_writestr(zf, arc_path: str, data: bytes):
+    if arc_path.lower().endswith(_PRECOMPRESSED_EXTS):
+        zf.writestr(arc_path, data, compress_type=zipfile.ZIP_STORED)
+    else:
+        # Level 1 keeps most of the ratio on small JSON/CSV/TXT at a fraction of the CPU
+        zf.writestr(arc_path, data, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+
 
-        if include_artifacts:
-            for a in artifacts:
-                # Put artifacts under inspection folder for tidy packaging
-                arc_path = f"inspection_{a['inspection_id']}/{a['name']}"
-                zf.writestr(arc_path, a["content"] if a["content"] is not None else b"")
+# Read size when copying a BLOB into the archive
+ZIP_COPY_CHUNK = 1 << 20
 
-    return buf.getvalue()
+
+def _zip_write_stream(zf, arc_path: str, src, hasher=None):
+    # Same compression choice as _zip_writestr, but copied from a file-like source in chunks.
+    # A plain name picks up the archive defaults (deflate, level 1).
+    target = arc_path
+    if arc_path.lower().endswith(_PRECOMPRESSED_EXTS):
+        target = zipfile.ZipInfo(arc_path, date_time=time.localtime()[:6])
+        target.compress_type = zipfile.ZIP_STORED
+    with zf.open(target, mode="w") as out:
+        if hasher is None:
+            shutil.copyfileobj(src, out, ZIP_COPY_CHUNK)
+            return
+        # Hash the same chunks as they are written, so verification costs no second read
+        for chunk in iter(lambda: src.read(ZIP_COPY_CHUNK), b""):
+            out.write(chunk)
+            hasher.update(chunk)
+
+
+def _iter_artifact_entries(con, inspection_ids: list[int]) -> Iterable[Tuple[str, Any, str]]:
+    """(archive path, bytes or open BLOB handle, stored SHA-256) per artifact.
+
+    On Python 3.11+ contents are read incrementally with Connection.blobopen,
+    so no artifact is ever fully loaded into memory; otherwise one row's
+    content is held at a time.
+    """
+    if not inspection_ids:
+        return
+    streaming = hasattr(con, "blobopen")
+    placeholders = ",".join(["?"] * len(inspection_ids))
+    cur = con.execute(f"""
+        SELECT id, inspection_id, name, sha256, {"content IS NULL AS is_null" if streaming else "content"}
+        FROM artifacts
+        WHERE inspection_id IN ({placeholders})
+        ORDER BY inspection_id DESC, name ASC
+    """, inspection_ids)
+    for a in cur:
+        # Put artifacts under inspection folder for tidy packaging
+        arc_path = f"inspection_{a['inspection_id']}/{a['name']}"
+        if not streaming:
+            yield arc_path, a["content"] if a["content"] is not None else b"", a["sha256"]
+        elif a["is_null"]:
+            yield arc_path, b"", a["sha256"]
+        else:
+            yield arc_path, con.blobopen("artifacts", "content", a["id"], readonly=True), a["sha256"]
+
+
+def _verify_artifact_hashes(con, artifacts) -> list:
+    """Re-hash stored artifact bodies; returns the artifacts whose SHA-256 no longer matches.
+
+    BLOBs are hashed in ZIP_COPY_CHUNK reads via blobopen where available, so
+    memory stays flat regardless of artifact size.
+    """
+    mismatched = []
+    for a in artifacts:
+        h = hashlib.sha256()
+        if not a["size_bytes"]:
+            pass  # empty or NULL content hashes as b""
+        elif hasattr(con, "blobopen"):
+            with con.blobopen("artifacts", "content", a["id"], readonly=True) as blob:
+                for chunk in iter(lambda: blob.read(ZIP_COPY_CHUNK), b""):
+                    h.update(chunk)
+        else:
+            row = con.execute("SELECT content FROM artifacts WHERE id=?", (a["id"],)).fetchone()
+            h.update(row["content"])
+        if h.hexdigest() != a["sha256"]:
+            mismatched.append(a)
+    return mismatched
+
+
+def _build_bundle_zip(manifest_csv: bytes, hashes_txt: bytes, entries: Iterable[Tuple[str, Any, str]],
+                      mismatched: list | None = None):
+    # Returns an open, rewound spooled file; the caller is responsible for closing it.
+    # When a ``mismatched`` list is passed, each artifact is hashed as it is copied
+    # and the archive paths whose SHA-256 differs from the stored value are appended.
+    tmp = SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES)
+    with zipfile.ZipFile(tmp, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        _zip_writestr(zf, "manifest.csv", manifest_csv)
+        _zip_writestr(zf, "hashes.sha256.txt", hashes_txt)
+
+        for arc_path, data, expected_sha in entries:
+            hasher = hashlib.sha256() if mismatched is not None else None
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                _zip_writestr(zf, arc_path, data)
+                if hasher is not None:
+                    hasher.update(data)
+            else:
+                with data:
+                    _zip_write_stream(zf, arc_path, data, hasher)
+            if hasher is not None and hasher.hexdigest() != expected_sha:
+                mismatched.append(arc_path)
+
+    tmp.seek(0)
+    return tmp
 
 
 def render_manifest_export():
@@ -146,6 +239,8 @@ def render_manifest_export():
     )
 
     con = get_connection()
+    # Every selection is scoped to the active tenant; artifacts follow via inspection_id
+    tenant_id = st.session_state.active_tenant
 
     # ---- Selection mode
     mode = st.radio(
@@ -155,17 +250,18 @@ def render_manifest_export():
         key="m_mode"
     )
 
-    where_sql = "1=1"
-    params = []
+    where_sql = "tenant_id=?"
+    params = [tenant_id]
 
     if mode == "Most recent N":
         n = st.number_input("N (most recent inspections)", min_value=1, max_value=2000, value=25, step=1, key="m_n")
         inspections = con.execute("""
             SELECT id, filename, sha256, ruleset, risk_level, risk_score, created_at
             FROM inspections
+            WHERE tenant_id=?
             ORDER BY created_at DESC
             LIMIT ?
-        """, (int(n),)).fetchall()
+        """, (tenant_id, int(n))).fetchall()
 
     elif mode == "Filter by date range":
         c1, c2 = st.columns(2)
@@ -179,8 +275,8 @@ def render_manifest_export():
         start_iso = f"{start.isoformat()}T00:00:00"
         end_iso = f"{end.isoformat()}T23:59:59"
 
-        where_sql = "created_at >= ? AND created_at <= ?"
-        params = [start_iso, end_iso]
+        where_sql = "tenant_id=? AND created_at >= ? AND created_at <= ?"
+        params = [tenant_id, start_iso, end_iso]
         inspections = _fetch_inspections(con, where_sql, params)
 
     else:  # Pick specific IDs
@@ -193,20 +289,18 @@ def render_manifest_export():
 
         if not ids:
             st.info("Enter one or more inspection IDs (e.g., 12, 15, 18).")
-            con.close()
             return
 
         placeholders = ",".join(["?"] * len(ids))
         inspections = con.execute(f"""
             SELECT id, filename, sha256, ruleset, risk_level, risk_score, created_at
             FROM inspections
-            WHERE id IN ({placeholders})
+            WHERE tenant_id=? AND id IN ({placeholders})
             ORDER BY created_at DESC
-        """, ids).fetchall()
+        """, [tenant_id, *ids]).fetchall()
 
     if not inspections:
         st.warning("No inspections found for this selection.")
-        con.close()
         return
 
     st.caption(f"Selected inspections: **{len(inspections)}**")
@@ -215,7 +309,7 @@ def render_manifest_export():
     include_artifacts = st.checkbox("Include artifact contents in ZIP bundle", value=True, key="m_inc_art")
     include_source_note = st.checkbox("Include file hash lines for source filenames (informational)", value=True, key="m_inc_src")
     # (hash list always includes artifacts; include_source_note controls whether we include the source/filename lines)
-    # We'll implement by filtering later.
+    verify_hashes = st.checkbox("Re-verify stored artifact hashes before export", value=False, key="m_verify")
 
     insp_ids = [int(r["id"]) for r in inspections]
     artifacts = _fetch_artifacts(con, insp_ids)
@@ -226,16 +320,33 @@ def render_manifest_export():
     if st.button("✅ Generate Manifest Package", type="primary", key="m_gen"):
         manifest_csv = _build_manifest_csv(inspections, artifacts)
 
-        hashes_txt = _build_hashes_txt(inspections, artifacts)
-        if not include_source_note:
-            # remove the source lines; keep only inspection_*/artifact lines
-            lines = hashes_txt.decode("utf-8").splitlines()
-            lines = [ln for ln in lines if not ln.endswith(tuple([f"source/{r['filename']}" for r in inspections]))]
-            hashes_txt = ("\n".join(lines) + "\n").encode("utf-8")
-
-        bundle_zip = _build_bundle_zip(manifest_csv, hashes_txt, artifacts, include_artifacts)
+        hashes_txt = _build_hashes_txt(inspections, artifacts, include_source=include_source_note)
+
+        mismatched = []
+        if verify_hashes and not include_artifacts:
+            # Nothing is copied into the bundle, so hash the stored BLOBs up front
+            mismatched = [
+                f"inspection_{a['inspection_id']}/{a['name']}"
+                for a in _verify_artifact_hashes(con, artifacts)
+            ]
+
+        if not mismatched:
+            entries = _iter_artifact_entries(con, insp_ids) if include_artifacts else ()
+            # Bundled artifacts are verified while they are copied (each BLOB is read once)
+            with _build_bundle_zip(manifest_csv, hashes_txt, entries,
+                                   mismatched=mismatched if verify_hashes else None) as zip_file:
+                bundle_zip = zip_file.read()
+
+        if mismatched:
+            st.error(
+                "Hash mismatch — export withheld: "
+                + ", ".join(mismatched)
+            )
+            return
 
         st.success("Manifest package generated.")
+        if verify_hashes:
+            st.success(f"All {len(artifacts)} artifact hashes verified.")
 
         # Downloads (KEY-SAFE)
         st.download_button(
@@ -264,5 +375,3 @@ def render_manifest_export():
             # Show a small preview without pandas dependency
             text = manifest_csv.decode("utf-8").splitlines()
             st.code("\n".join(text[:31]))
-
-    con.close()
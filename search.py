@@ -20,7 +20,7 @@ def render_search_page():
         min_score = st.slider("Min score", 0, 100, 0, key="s_min")
         max_score = st.slider("Max score", 0, 100, 100, key="s_max")
 
-    where, params = [], []
+    where, params = ["tenant_id=?"], [st.session_state.active_tenant]
 
     if filename_q:
         where.append("filename LIKE ?")
@@ -50,18 +50,23 @@ def render_search_page():
 
     st.caption(f"{len(rows)} result(s)")
 
+    # Artifacts for all results in one query instead of one per result
+    ids = [r["id"] for r in rows]
+    placeholders = ",".join(["?"] * len(ids))
+    arts_by_insp = {}
+    for a in con.execute(f"""
+        SELECT inspection_id, name, sha256, content
+        FROM artifacts
+        WHERE inspection_id IN ({placeholders})
+    """, ids):
+        arts_by_insp.setdefault(a["inspection_id"], []).append(a)
+
     for r in rows:
         with st.expander(f"#{r['id']} • {r['filename']} • {r['risk_level']} ({r['risk_score']})"):
-            art_rows = con.execute("""
-                SELECT name, sha256, content FROM artifacts WHERE inspection_id=?
-            """, (r["id"],)).fetchall()
-
-            for a in art_rows:
+            for a in arts_by_insp.get(r["id"], []):
                 st.download_button(
                     f"⬇ {a['name']}",
                     data=a["content"],
                     file_name=a["name"],
                     key=f"s_dl_{r['id']}_{a['name']}"
                 )
-
-    con.close()
@@ -1,12 +1,12 @@
 import streamlit as st
-from db import get_db
+from db import get_connection
 from permissions import can_view_all_tenants
 
 def ensure_active_tenant():
     user = st.session_state.user
 
     if can_view_all_tenants(user["role"]):
-        con = get_db()
+        con = get_connection()
         tenants = con.execute(
             "SELECT id, name FROM tenants WHERE is_active=1 ORDER BY name"
         ).fetchall()
@@ -0,0 +1,45 @@
+import re
+
+import pytest
+
+import analysis_engine
+from rulesets import RULESETS
+
+
+PATTERNS = sorted({p["regex"] for rs in RULESETS.values() for p in rs["patterns"].values()})
+
+SAMPLES = [
+    "SSN 123-45-6789 and DoD ID 1234567890",
+    "SSN ١٢٣-٤٥-٦٧٨٩ and DoD ID ١٢٣٤٥٦٧٨٩٠",  # Arabic-Indic digits
+    "éITAR ITARé itar, ear; Über EAR",
+    "CAGE 1ABC2 / ＡＢＣＤＥ, IOC or indicator of compromise",
+]
+
+
+def _spans(rx, text):
+    return [m.span() for m in rx.finditer(text)]
+
+
+def _re_fallback(pattern, monkeypatch):
+    monkeypatch.setattr(analysis_engine, "re2", None)
+    analysis_engine._compile.cache_clear()
+    try:
+        return analysis_engine._compile(pattern)
+    finally:
+        analysis_engine._compile.cache_clear()
+
+
+def test_re_fallback_is_ascii_only(monkeypatch):
+    rx = _re_fallback(r"\b\d{3}-\d{2}-\d{4}\b", monkeypatch)
+    assert rx.flags & re.ASCII
+    assert _spans(rx, SAMPLES[0]) == [(4, 15)]
+    assert _spans(rx, SAMPLES[1]) == []
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_re_fallback_matches_re2(pattern, monkeypatch):
+    re2 = pytest.importorskip("re2")
+    expected = re2.compile(f"(?i){pattern}")
+    rx = _re_fallback(pattern, monkeypatch)
+    for text in SAMPLES:
+        assert _spans(rx, text) == _spans(expected, text)
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+
+from artifacts import build_artifacts
+
+
+META = {"filename": "a,b.pdf", "sha256": "00" * 32, "uploaded_at": "2026-01-01T00:00:00Z"}
+
+
+def _analysis(detected_patterns):
+    return {
+        "ruleset": "Basic",
+        "risk_level": "HIGH",
+        "risk_score": 80,
+        "cui_detected": True,
+        "missing_markings_heuristic": False,
+        "cui_categories": [{"category": "Export Control", "confidence": 0.9}],
+        "detected_patterns": detected_patterns,
+        "recommendations": [],
+        "compliance_mapping": {},
+    }
+
+
+def test_summary_csv_golden_bytes():
+    # Pins the evidence bytes: True/False booleans, risk_score widened to float by the
+    # pattern rows, minimal quoting (commas and doubled quotes), \n line endings.
+    analysis = _analysis([
+        {"pattern": "SSN", "category": "PII", "confidence": 0.9, "excerpt": 'SSN: 123-45-6789, "Jane"'},
+        {"pattern": "ITAR", "category": "Export Control", "confidence": 0.78, "excerpt": "ITAR data"},
+    ])
+    csv_bytes = build_artifacts(META, analysis, generated_at="t")["analysis_summary.csv"]
+    assert csv_bytes == (
+        b"filename,sha256,uploaded_at,ruleset,risk_level,risk_score,cui_detected,"
+        b"missing_markings_heuristic,cui_categories,type,pattern,category,confidence,excerpt\n"
+        b'"a,b.pdf",' + b"00" * 32 + b",2026-01-01T00:00:00Z,Basic,HIGH,80.0,True,False,Export Control,,,,,\n"
+        b',,,,,,,,,pattern_hit,SSN,PII,0.9,"SSN: 123-45-6789, ""Jane"""\n'
+        b",,,,,,,,,pattern_hit,ITAR,Export Control,0.78,ITAR data\n"
+    )
+
+
+def test_summary_csv_without_pattern_rows_has_summary_columns_only():
+    csv_bytes = build_artifacts(META, _analysis([]), generated_at="t")["analysis_summary.csv"]
+    header = csv_bytes.split(b"\n", 1)[0]
+    assert header == (b"filename,sha256,uploaded_at,ruleset,risk_level,risk_score,"
+                      b"cui_detected,missing_markings_heuristic,cui_categories")
+
+
+def test_json_artifacts_escape_non_ascii():
+    # Stdlib encoder only: orjson would write "…" as raw UTF-8 and change the hash
+    analysis = _analysis([{"pattern": "ssn", "category": "PII", "confidence": 0.8, "excerpt": "“quoted” …"}])
+    artifacts = build_artifacts(META, analysis, generated_at="t")
+    findings = artifacts["cui_findings.json"]
+    assert findings.isascii()
+    assert b'"excerpt": "\\u201cquoted\\u201d \\u2026"' in findings
+    assert artifacts["compliance_mapping.json"] == b"{}"
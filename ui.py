@@ -1,3 +1,4 @@
+import importlib
 import sys
 from pathlib import Path
 import streamlit as st
@@ -10,16 +11,21 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from db import init_db
-from auth import render_login, require_login, logout
+from authy import render_login, require_login, logout
 from tenants import ensure_active_tenant
 from permissions import is_read_only
 from audit_log import log_event
 
-from document_inspector import render_document_inspector
-from evidence_vault import render_evidence_vault
-from search import render_search_page
-from compare import render_compare_page
-from manifest import render_manifest_export
+# Page modules (and their pandas/pyarrow/zipfile dependencies) are imported
+# lazily in render_app so login and the sidebar paint before they load.
+# page label -> (module, render function, audit action or None)
+PAGES = {
+    "Document Inspector": ("ui_render_document_inspector_option2", "render_document_inspector", "document_inspection"),
+    "Evidence Vault": ("evidence_vault", "render_evidence_vault", None),
+    "Search": ("search", "render_search_page", None),
+    "Compare": ("compare", "render_compare_page", None),
+    "Manifest Export": ("manifest", "render_manifest_export", "manifest_export"),
+}
 
 
 def render_sidebar(user):
@@ -37,13 +43,7 @@ def render_sidebar(user):
 
     return st.sidebar.radio(
         "Navigation",
-        [
-            "Document Inspector",
-            "Evidence Vault",
-            "Search",
-            "Compare",
-            "Manifest Export",
-        ],
+        list(PAGES),
         key="nav_radio",
     )
 
@@ -64,22 +64,10 @@ def render_app():
         st.warning("🔍 Auditor access is read-only. Uploads are disabled.")
         return
 
-    if page == "Document Inspector":
-        render_document_inspector()
-        log_event(user, "document_inspection")
-
-    elif page == "Evidence Vault":
-        render_evidence_vault()
-
-    elif page == "Search":
-        render_search_page()
-
-    elif page == "Compare":
-        render_compare_page()
-
-    elif page == "Manifest Export":
-        render_manifest_export()
-        log_event(user, "manifest_export")
+    module_name, render_name, audit_action = PAGES[page]
+    getattr(importlib.import_module(module_name), render_name)()
+    if audit_action:
+        log_event(user, audit_action)
 
 
 
@@ -3,7 +3,7 @@
 
 import streamlit as st
 from extractors import extract_text_from_file
-from utils import now_iso, sha256_bytes
+from utils import now_iso, sha256_bytes, fast_digest
 from rulesets import RULESETS, ruleset_names
 from analysis_engine import analyze_text
 from artifacts import build_artifacts, artifacts_to_download_buttons
@@ -16,23 +16,31 @@ def render_document_inspector():
     with colA:
         uploaded = st.file_uploader(
             "Upload a document",
-            type=["pdf", "txt", "docx", "pptx"],
+            type=["pdf", "txt", "docx", "pptx", "xlsx"],
             key="doc_upload"
         )
 
         if uploaded:
-            text = extract_text_from_file(uploaded)
-            meta = {
-                "filename": uploaded.name,
-                "size_bytes": uploaded.size,
-                "sha256": sha256_bytes(uploaded.getvalue()),
-                "uploaded_at": now_iso(),
-            }
-
-            st.session_state.last_text = text
-            st.session_state.last_meta = meta
-            st.session_state.last_analysis = None
-            st.session_state.artifacts = None
+            # getbuffer() is a zero-copy view of the upload; getvalue() would copy it.
+            content_key = f"{uploaded.name}:{fast_digest(uploaded.getbuffer())}"
+
+            # Extraction (incl. OCR) runs once per distinct upload, keyed by content hash;
+            # other reruns reuse the cached text and keep the current analysis.
+            # The cheap fast_digest gates this so SHA-256 is only paid for new uploads.
+            if st.session_state.get("last_content_key") != content_key:
+                st.session_state.last_text = extract_text_from_file(uploaded)
+                st.session_state.last_meta = {
+                    "filename": uploaded.name,
+                    "size_bytes": uploaded.size,
+                    "sha256": sha256_bytes(uploaded.getbuffer()),
+                    "uploaded_at": now_iso(),
+                }
+                st.session_state.last_content_key = content_key
+                st.session_state.last_analysis = None
+                st.session_state.artifacts = None
+
+            text = st.session_state.last_text
+            meta = st.session_state.last_meta
 
             st.subheader("File Metadata")
             st.json(meta)
@@ -46,15 +54,21 @@ def render_document_inspector():
         rs_name = st.selectbox("Ruleset", ruleset_names(), key="ruleset_select")
         st.caption(RULESETS[rs_name]["description"])
 
-        can_run = bool((st.session_state.last_text or "").strip())
+        can_run = bool((st.session_state.get("last_text") or "").strip())
         if st.button("▶ Run Analysis", type="primary", disabled=not can_run, key="run_analysis"):
             analysis = analyze_text(st.session_state.last_text, rs_name)
+            # One timestamp for the artifacts and the stored inspection row
+            ts = now_iso()
             st.session_state.last_analysis = analysis
-            st.session_state.artifacts = build_artifacts(st.session_state.last_meta, analysis)
+            st.session_state.artifacts = build_artifacts(st.session_state.last_meta, analysis, generated_at=ts)
 
-            save_inspection(st.session_state.last_meta, analysis, st.session_state.artifacts)
+            if st.session_state.get("active_tenant") is None:
+                st.error("No active tenant selected; the inspection was not saved to the Evidence Vault")
+            else:
+                save_inspection(st.session_state.last_meta, analysis, st.session_state.artifacts,
+                                tenant_id=st.session_state.active_tenant, created_at=ts)
 
-        if st.session_state.last_analysis:
+        if st.session_state.get("last_analysis"):
             a = st.session_state.last_analysis
 
             st.divider()
@@ -69,8 +83,10 @@ def render_document_inspector():
                 for i, s in enumerate(a.get("signals", []), 1):
                     st.write(f"{i}. {s}")
 
-            pf = a.get("patterns_found", {}) or {}
-            st.markdown(f"**Patterns Found:** {sum(int(v) for v in pf.values())}")
+            total = a.get("patterns_total")
+            if total is None:  # analyses saved before patterns_total existed
+                total = sum(int(v) for v in (a.get("patterns_found", {}) or {}).values())
+            st.markdown(f"**Patterns Found:** {total}")
 
             with st.expander("🧬 Detected Patterns"):
                 dps = a.get("detected_patterns", [])
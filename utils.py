@@ -1,9 +1,25 @@
-from datetime import datetime
+from datetime import datetime, timezone
 import hashlib
+import hmac
+import os
+
+try:
+    import xxhash
+except Exception:
+    xxhash = None
+
+try:
+    from argon2 import PasswordHasher
+    _argon2 = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+except Exception:
+    _argon2 = None
+
+# pbkdf2_hmac runs inside OpenSSL (SHA-NI accelerated where the CPU has it)
+PBKDF2_ITERATIONS = 200_000
 
 
 def now_iso():
-    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 def sha256_bytes(data: bytes):
@@ -12,6 +28,44 @@ def sha256_bytes(data: bytes):
     return h.hexdigest()
 
 
+def fast_digest(data: bytes):
+    """Non-cryptographic content key for caches; use sha256_bytes for evidence."""
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_password(password: str) -> str:
+    """Argon2id when argon2-cffi is installed, else ``pbkdf2_sha256$iters$salt$hash``."""
+    if _argon2 is not None:
+        return _argon2.hash(password)
+    salt = os.urandom(16)
+    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt.hex()}${dk.hex()}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    # Dispatch on the stored format so existing PBKDF2 hashes keep verifying
+    if not stored:
+        return False
+    if stored.startswith("$argon2"):
+        if _argon2 is None:
+            return False
+        try:
+            return _argon2.verify(stored, password)
+        except Exception:
+            return False
+    try:
+        algo, iterations, salt_hex, hash_hex = stored.split("$")
+        if algo != "pbkdf2_sha256":
+            return False
+        dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"),
+                                 bytes.fromhex(salt_hex), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(dk.hex(), hash_hex)
+
+
 def clamp(n, lo, hi):
     return max(lo, min(hi, n))
 